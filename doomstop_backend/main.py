@@ -28,16 +28,28 @@ threading lock or async primitives, but the in‑memory approach is
 acceptable for this example.
 """
 
-from datetime import datetime, timedelta
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
 from typing import Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, Header, Depends
+from fastapi import FastAPI, HTTPException, Header, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
+import asyncio
+import gzip
+import hmac
+import logging
+import orjson
 import sqlite3
-import json
+import threading
+import time
 
 
-app = FastAPI(title="DoomStop Backend", version="0.2.0")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="DoomStop Backend", version="0.2.0", default_response_class=ORJSONResponse)
 
 
 class TriviaQuestion(BaseModel):
@@ -89,15 +101,24 @@ quick_wins: List[str] = [
 ]
 
 
-def get_loop_objects() -> List[Loop]:
-    """Construct unified loop objects from the sample content."""
-    loops: List[Loop] = []
+def get_loop_objects() -> List[Dict]:
+    """Construct unified loop dicts from the sample content.
+
+    Plain dicts rather than Loop models: this data is already well-formed
+    and only feeds the DB seed and the fallback response, so running it
+    through Pydantic validation would be wasted work.
+    """
+    loops: List[Dict] = []
     for q in trivia_questions:
-        loops.append(Loop(id=1000 + q.id, type="trivia", content=q.dict()))
+        loops.append({
+            "id": 1000 + q.id,
+            "type": "trivia",
+            "content": {"id": q.id, "question": q.question, "options": q.options, "answer": q.answer},
+        })
     for idx, m in enumerate(memes, start=1):
-        loops.append(Loop(id=2000 + idx, type="meme", content={"text": m}))
+        loops.append({"id": 2000 + idx, "type": "meme", "content": {"text": m}})
     for idx, w in enumerate(quick_wins, start=1):
-        loops.append(Loop(id=3000 + idx, type="quick_win", content={"text": w}))
+        loops.append({"id": 3000 + idx, "type": "quick_win", "content": {"text": w}})
     return loops
 
 
@@ -109,27 +130,80 @@ DB_PATH = "doomstop.db"
 
 
 def get_db_connection():
-    """Return a connection to the SQLite database. SQLite3 connections
+    """Return a new connection to the SQLite database. SQLite3 connections
     are not thread‑safe by default if check_same_thread is True; we
-    disable that check because FastAPI may use threads. Each request
-    should obtain its own connection.
+    disable that check because FastAPI may use threads. Connections are
+    created in autocommit mode (isolation_level=None) so that the pool
+    never hands out a connection with a transaction left open.
+
+    Each connection is tuned for this API's read-heavy workload: WAL
+    journal mode lets readers proceed while a write is in flight,
+    synchronous=NORMAL drops the per-commit fsync that WAL makes safe to
+    skip, and the cache/mmap settings keep hot pages in memory.
     """
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    # Checkpointing is handled by the background _checkpointer task, so no
+    # request-serving connection ever pauses to fold the WAL back into the
+    # main database file.
+    conn.execute("PRAGMA wal_autocheckpoint=0")
+    return conn
+
+
+# Every threadpool worker keeps its own long-lived, WAL-tuned connection.
+# Sync endpoints run in anyio's threadpool, and WAL supports concurrent
+# readers, so per-thread connections let reads scale with the worker count
+# with no hand-off through a shared queue and no lock contention on it.
+_TLS = threading.local()
+
+
+@contextmanager
+def db():
+    """Context manager yielding the calling thread's connection.
+
+    The connection persists across requests handled by the same thread.
+    If the request raised, it is closed and dropped so a half-broken
+    connection is never reused; the next request on that thread opens a
+    fresh one.
+    """
+    conn = getattr(_TLS, "conn", None)
+    if conn is None:
+        conn = _TLS.conn = get_db_connection()
+    try:
+        yield conn
+    except Exception:
+        conn.close()
+        _TLS.conn = None
+        raise
+    finally:
+        try:
+            # Cheap after the first run; keeps planner statistics fresh so
+            # the indexes added in init_db actually get picked.
+            conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
 
 
 def init_db():
     """Initialise the SQLite database with required tables and default data."""
     conn = get_db_connection()
     cur = conn.cursor()
-    # Users table
+    # Users table. Dates are stored as integer unix seconds so reads can
+    # compare and bucket them with plain integer arithmetic instead of
+    # parsing ISO strings on every request.
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS users (
             user_id TEXT PRIMARY KEY,
-            join_date TEXT,
+            join_date INTEGER,
             total_escapes INTEGER,
             today_escapes INTEGER,
-            last_escape TEXT,
+            last_escape INTEGER,
             streak INTEGER
         )
         """
@@ -148,48 +222,287 @@ def init_db():
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS user_loops (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            id INTEGER PRIMARY KEY,
             user_id TEXT,
             loop_id INTEGER,
             success INTEGER,
-            timestamp TEXT
+            timestamp INTEGER
         )
         """
     )
+    # One-time migration: databases created before the integer-timestamp
+    # change declared the date columns TEXT and stored ISO strings, which
+    # would make every utcfromtimestamp() call on the read paths blow up.
+    # An in-place UPDATE is not enough — TEXT affinity coerces converted
+    # values straight back to strings — so the affected tables are rebuilt
+    # with the new schema, converting via strftime('%s', ...) on the way
+    # across. Dropped indexes are recreated below.
+    cols = {info[1]: (info[2] or "").upper() for info in cur.execute("PRAGMA table_info(users)")}
+    if cols.get("join_date") == "TEXT":
+        cur.execute("BEGIN")
+        cur.execute(
+            """
+            CREATE TABLE users_migrated (
+                user_id TEXT PRIMARY KEY,
+                join_date INTEGER,
+                total_escapes INTEGER,
+                today_escapes INTEGER,
+                last_escape INTEGER,
+                streak INTEGER
+            )
+            """
+        )
+        cur.execute(
+            """
+            INSERT INTO users_migrated
+            SELECT user_id,
+                   CAST(strftime('%s', join_date) AS INTEGER),
+                   total_escapes,
+                   today_escapes,
+                   CASE WHEN last_escape IS NULL THEN NULL
+                        ELSE CAST(strftime('%s', last_escape) AS INTEGER) END,
+                   streak
+            FROM users
+            """
+        )
+        cur.execute("DROP TABLE users")
+        cur.execute("ALTER TABLE users_migrated RENAME TO users")
+        cur.execute("COMMIT")
+    cols = {info[1]: (info[2] or "").upper() for info in cur.execute("PRAGMA table_info(user_loops)")}
+    if cols.get("timestamp") == "TEXT":
+        cur.execute("BEGIN")
+        cur.execute(
+            """
+            CREATE TABLE user_loops_migrated (
+                id INTEGER PRIMARY KEY,
+                user_id TEXT,
+                loop_id INTEGER,
+                success INTEGER,
+                timestamp INTEGER
+            )
+            """
+        )
+        cur.execute(
+            "INSERT INTO user_loops_migrated "
+            "SELECT id, user_id, loop_id, success, CAST(strftime('%s', timestamp) AS INTEGER) FROM user_loops"
+        )
+        cur.execute("DROP TABLE user_loops")
+        cur.execute("ALTER TABLE user_loops_migrated RENAME TO user_loops")
+        cur.execute("COMMIT")
+    # Per-user history index so queries over a user's completions don't
+    # have to scan the whole audit table.
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_user_loops_user_ts ON user_loops (user_id, timestamp)"
+    )
+    # Leaderboard index: lets the ORDER BY total_escapes DESC LIMIT query
+    # stream the top rows straight from the index instead of sorting the
+    # whole users table on every /leaderboard call.
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_users_total_escapes ON users (total_escapes DESC)"
+    )
     conn.commit()
     # Populate loops table if empty
     cur.execute("SELECT COUNT(*) FROM loops")
     count = cur.fetchone()[0]
     if count == 0:
-        for loop in get_loop_objects():
-            cur.execute(
-                "INSERT INTO loops (loop_id, type, content) VALUES (?, ?, ?)",
-                (loop.id, loop.type, json.dumps(loop.content))
-            )
-        conn.commit()
+        # Seed in one statement: executemany prepares the INSERT once and
+        # binds each row, instead of parsing a fresh statement per loop.
+        rows = [(loop["id"], loop["type"], orjson.dumps(loop["content"]).decode()) for loop in get_loop_objects()]
+        cur.execute("BEGIN")
+        cur.executemany("INSERT INTO loops (loop_id, type, content) VALUES (?, ?, ?)", rows)
+        cur.execute("COMMIT")
     conn.close()
 
 
+# Write-behind machinery for loop completions. POSTs no longer wait for
+# the WAL append: the handler updates an in-memory mirror of the user's
+# stats, enqueues the delta, and returns. A background task drains the
+# queue and persists whole batches in one transaction, so many requests
+# share a single commit. The tradeoff is relaxed durability — completions
+# enqueued in the last flush interval are lost if the process dies — and
+# reads from the DB can trail the mirror by up to that interval.
+_STATS: Dict[str, list] = {}  # user_id -> [join_date, total, today, last_escape, streak]
+_WRITE_QUEUE: "asyncio.Queue[tuple]" = asyncio.Queue()
+_FLUSH_BATCH = 500  # max completions per transaction
+_FLUSH_INTERVAL = 0.05  # seconds to wait for more work before committing
+_FLUSH_RETRY_DELAY = 0.5  # seconds to back off after a failed write
+_flush_task: Optional[asyncio.Task] = None
+
+
+def _load_user_stats(user_id: str) -> Optional[tuple]:
+    """Fetch a user's persisted stats for seeding the in-memory mirror."""
+    with db() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT join_date, total_escapes, today_escapes, last_escape, streak FROM users WHERE user_id = ?",
+            (user_id,)
+        )
+        return cur.fetchone()
+
+
+def _write_batch(batch: List[tuple]) -> None:
+    """Persist a batch of loop completions in a single transaction."""
+    user_rows = [item[:6] for item in batch]
+    audit_rows = [(item[0], item[6], item[7], item[4]) for item in batch]
+    with db() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            # The mirror already computed the final counters, so the upsert
+            # just overwrites; join_date is preserved for existing users.
+            cur.executemany(
+                """
+                INSERT INTO users (user_id, join_date, total_escapes, today_escapes, last_escape, streak)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    total_escapes = excluded.total_escapes,
+                    today_escapes = excluded.today_escapes,
+                    last_escape = excluded.last_escape,
+                    streak = excluded.streak
+                """,
+                user_rows
+            )
+            cur.executemany(
+                "INSERT INTO user_loops (user_id, loop_id, success, timestamp) VALUES (?, ?, ?, ?)",
+                audit_rows
+            )
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+
+
+async def _flusher() -> None:
+    """Drain the write queue, batching completions into shared commits.
+
+    A failed write (e.g. SQLITE_BUSY outliving busy_timeout) is logged
+    and retried with the same batch after a short back-off, so a
+    transient error never kills the task or silently drops completions.
+    The batch is retried in place rather than re-queued to keep each
+    user's snapshots applying in order. If the task is cancelled while
+    holding popped items, it flushes them before exiting.
+    """
+    while True:
+        batch = [await _WRITE_QUEUE.get()]
+        try:
+            while len(batch) < _FLUSH_BATCH:
+                try:
+                    batch.append(await asyncio.wait_for(_WRITE_QUEUE.get(), timeout=_FLUSH_INTERVAL))
+                except asyncio.TimeoutError:
+                    break
+            while True:
+                try:
+                    await run_in_threadpool(_write_batch, batch)
+                    break
+                except Exception:
+                    logger.exception(
+                        "failed to persist batch of %d loop completion(s); retrying", len(batch)
+                    )
+                    await asyncio.sleep(_FLUSH_RETRY_DELAY)
+        except asyncio.CancelledError:
+            # Shutdown caught us holding items already popped from the
+            # queue; persist them now so the shutdown drain (which only
+            # sees what is still queued) doesn't miss them.
+            try:
+                await run_in_threadpool(_write_batch, batch)
+            except Exception:
+                logger.exception(
+                    "failed to persist %d loop completion(s) during shutdown", len(batch)
+                )
+            raise
+
+
+# With wal_autocheckpoint disabled, the WAL would grow without bound; this
+# task periodically folds it back into the main database file from its own
+# connection, off every request path.
+_CHECKPOINT_INTERVAL = 5.0  # seconds
+_checkpoint_task: Optional[asyncio.Task] = None
+
+
+async def _checkpointer() -> None:
+    """Periodically checkpoint and truncate the WAL in the background."""
+    conn = await run_in_threadpool(get_db_connection)
+    try:
+        while True:
+            await asyncio.sleep(_CHECKPOINT_INTERVAL)
+            await run_in_threadpool(conn.execute, "PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+
 # Simple API key for authentication. In a real application, integrate a
 # proper authentication system (OAuth2, JWT, etc.). Clients must
 # provide this key in the `Authorization` header as `Bearer <API_KEY>` to
 # access protected endpoints.
 API_KEY = "doomstop-secret-token"
+_API_KEY_BYTES = API_KEY.encode()
+
+
+@lru_cache(maxsize=1024)
+def _check_authorization(authorization: str) -> None:
+    """Validate a raw Authorization header value, raising on failure.
+
+    The token is compared with hmac.compare_digest so the check runs in
+    constant time and doesn't leak key prefixes through response timing.
+    Accepted header values are memoized, so repeat requests from the same
+    client reduce to a dict lookup; rejections raise and are never
+    cached. Call .cache_clear() if the API key is ever rotated.
+    """
+    if not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
+    token = authorization[7:].encode()  # everything after "Bearer "
+    if not hmac.compare_digest(token, _API_KEY_BYTES):
+        raise HTTPException(status_code=403, detail="Invalid API key")
 
 
 def verify_api_key(authorization: Optional[str] = Header(None)):
     """Dependency to verify the Authorization header for protected endpoints."""
-    if authorization is None or not authorization.startswith("Bearer "):
+    if authorization is None:
         raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
-    token = authorization.split(" ")[1]
-    if token != API_KEY:
-        raise HTTPException(status_code=403, detail="Invalid API key")
+    _check_authorization(authorization)
 
 
 # Initialise the database on startup
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
+    global _flush_task, _checkpoint_task
     init_db()
+    # Warm the /loops cache so even the first request is served from memory.
+    _refresh_loops_cache()
+    _flush_task = asyncio.create_task(_flusher())
+    _checkpoint_task = asyncio.create_task(_checkpointer())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Stop the flusher and persist anything still queued so a clean
+    # shutdown loses no completions.
+    if _flush_task is not None:
+        _flush_task.cancel()
+        try:
+            await _flush_task
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # If the flusher died earlier, awaiting it re-raises its
+            # error; swallow it so the drain below still runs.
+            logger.exception("flusher task had died with an unhandled error")
+    batch = []
+    while not _WRITE_QUEUE.empty():
+        batch.append(_WRITE_QUEUE.get_nowait())
+    if batch:
+        try:
+            await run_in_threadpool(_write_batch, batch)
+        except Exception:
+            logger.exception(
+                "failed to persist %d queued loop completion(s) at shutdown", len(batch)
+            )
+    if _checkpoint_task is not None:
+        _checkpoint_task.cancel()
+        try:
+            await _checkpoint_task
+        except asyncio.CancelledError:
+            pass
 
 
 
@@ -198,166 +511,177 @@ class LoopCompletionRequest(BaseModel):
     success: bool = Field(..., description="Whether the user successfully completed the loop")
 
 
-@app.get("/loops", response_model=List[Loop])
-async def get_loops() -> List[Loop]:
-    """Return all available loops for clients to pick from.
+# Loops change rarely (seeded once in init_db), so the serialized response
+# is cached in-process — raw and pre-gzipped — and refreshed at most once
+# per TTL. Cache hits skip SQLite, JSON parsing, Pydantic validation and
+# per-request compression entirely. The cache is warmed at startup.
+_LOOPS_CACHE: Optional[tuple] = None  # (monotonic ts, JSON bytes, gzipped bytes)
+_LOOPS_CACHE_TTL = 60.0  # seconds
 
-    This endpoint does not require authentication. It reads loops from
-    the database so that administrators can update content without
-    redeploying the API. If the database is unavailable, it falls back
-    to the statically defined loops in memory.
-    """
+
+def _refresh_loops_cache() -> tuple:
+    """Rebuild the cached /loops payload from the DB (or the fallback)."""
+    global _LOOPS_CACHE
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT loop_id, type, content FROM loops")
-        rows = cur.fetchall()
-        conn.close()
-        loops: List[Loop] = []
+        with db() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT loop_id, type, content FROM loops")
+            rows = cur.fetchall()
+        loops = []
         for loop_id, ltype, content_json in rows:
             try:
-                content = json.loads(content_json)
+                content = orjson.loads(content_json)
             except Exception:
                 content = {}
-            loops.append(Loop(id=loop_id, type=ltype, content=content))
-        # If loops exist in DB return them; otherwise fall back to in-memory
-        return loops if loops else get_loop_objects()
+            loops.append({"id": loop_id, "type": ltype, "content": content})
+        # If loops exist in DB use them; otherwise fall back to in-memory
+        if not loops:
+            loops = get_loop_objects()
     except Exception:
         # In case of any DB error, fall back to static definitions
-        return get_loop_objects()
+        loops = get_loop_objects()
+    payload = orjson.dumps(loops)
+    _LOOPS_CACHE = (time.monotonic(), payload, gzip.compress(payload, 6))
+    return _LOOPS_CACHE
+
+
+# No response_model here: the payload is pre-serialized bytes, and running
+# it back through Pydantic validation would undo the point of the cache.
+@app.get("/loops")
+def get_loops(request: Request) -> Response:
+    """Return all available loops for clients to pick from.
+
+    This endpoint does not require authentication. It reads loops from
+    the database so that administrators can update content without
+    redeploying the API (changes show up within the cache TTL). If the
+    database is unavailable, it falls back to the statically defined
+    loops in memory. Clients that advertise gzip support get the
+    pre-compressed payload at zero per-request CPU cost.
+    """
+    cache = _LOOPS_CACHE
+    if cache is None or time.monotonic() - cache[0] >= _LOOPS_CACHE_TTL:
+        cache = _refresh_loops_cache()
+    headers = {"Vary": "Accept-Encoding"}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=cache[2], media_type="application/json", headers=headers)
+    return Response(content=cache[1], media_type="application/json", headers=headers)
 
 
 @app.get("/users/{user_id}", response_model=UserStats)
-async def get_user_stats(user_id: str, auth: None = Depends(verify_api_key)) -> UserStats:
+def get_user_stats(user_id: str, auth: None = Depends(verify_api_key)) -> UserStats:
     """Retrieve stats for a given user, creating the user if necessary.
 
     This endpoint requires a valid API key in the Authorization header.
     """
-    conn = get_db_connection()
-    cur = conn.cursor()
-    # Fetch user
-    cur.execute("SELECT user_id, join_date, total_escapes, today_escapes, last_escape, streak FROM users WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
-    if row is None:
-        # Create new user record
-        now = datetime.utcnow().isoformat()
+    now = int(time.time())
+    with db() as conn:
+        cur = conn.cursor()
+        # Fetch-or-create in one statement: the no-op DO UPDATE turns the
+        # conflict into a way to RETURNING the existing row, so both the
+        # new-user and known-user paths cost a single query.
         cur.execute(
-            "INSERT INTO users (user_id, join_date, total_escapes, today_escapes, last_escape, streak) VALUES (?, ?, 0, 0, NULL, 0)",
+            """
+            INSERT INTO users (user_id, join_date, total_escapes, today_escapes, last_escape, streak)
+            VALUES (?, ?, 0, 0, NULL, 0)
+            ON CONFLICT(user_id) DO UPDATE SET user_id = excluded.user_id
+            RETURNING user_id, join_date, total_escapes, today_escapes, last_escape, streak
+            """,
             (user_id, now)
         )
-        conn.commit()
-        user = UserStats(user_id=user_id, join_date=datetime.fromisoformat(now), total_escapes=0, today_escapes=0, last_escape=None, streak=0)
-    else:
-        user = UserStats(
-            user_id=row[0],
-            join_date=datetime.fromisoformat(row[1]),
-            total_escapes=row[2],
-            today_escapes=row[3],
-            last_escape=datetime.fromisoformat(row[4]) if row[4] else None,
-            streak=row[5]
-        )
-    conn.close()
-    return user
+        row = cur.fetchone()
+    # model_construct skips validation; safe because the row came from our
+    # own INSERTs and was validated on the way in.
+    return UserStats.model_construct(
+        user_id=row[0],
+        join_date=datetime.utcfromtimestamp(row[1]),
+        total_escapes=row[2],
+        today_escapes=row[3],
+        last_escape=datetime.utcfromtimestamp(row[4]) if row[4] is not None else None,
+        streak=row[5]
+    )
 
 
 @app.post("/users/{user_id}/loop")
 async def complete_loop(user_id: str, request: LoopCompletionRequest, auth: None = Depends(verify_api_key)):
     """Record a user’s completion of a loop and update their stats.
 
-    Requires a valid API key. Updates the user record and stores a row
-    in the user_loops table for audit purposes.
+    Requires a valid API key. The stats update happens against the
+    in-memory mirror and the DB write is queued for the background
+    flusher, so the response does not wait on a commit. Completions
+    queued in the last flush interval can be lost on an unclean
+    shutdown — an acceptable tradeoff for this data.
     """
-    now = datetime.utcnow()
-    conn = get_db_connection()
-    cur = conn.cursor()
-    # Ensure user exists
-    cur.execute("SELECT user_id, join_date, total_escapes, today_escapes, last_escape, streak FROM users WHERE user_id = ?", (user_id,))
-    row = cur.fetchone()
-    if row is None:
-        # Create new user record
-        join_date = now.isoformat()
-        cur.execute(
-            "INSERT INTO users (user_id, join_date, total_escapes, today_escapes, last_escape, streak) VALUES (?, ?, 0, 0, NULL, 0)",
-            (user_id, join_date)
-        )
-        total_escapes = 0
-        today_escapes = 0
-        last_escape = None
-        streak = 0
-    else:
-        total_escapes = row[2]
-        today_escapes = row[3]
-        last_escape = datetime.fromisoformat(row[4]) if row[4] else None
-        streak = row[5]
+    now = int(time.time())
+    today = now // 86400  # day bucket, integer compare instead of date()
+    success = 1 if request.success else 0
+    stats = _STATS.get(user_id)
+    if stats is None:
+        # First touch this process: seed the mirror from the DB (runs in
+        # the threadpool so the event loop is not blocked).
+        row = await run_in_threadpool(_load_user_stats, user_id)
+        stats = _STATS.setdefault(user_id, list(row) if row is not None else [now, 0, 0, None, 0])
+    join_date, total_escapes, today_escapes, last_escape, streak = stats
+    # Day delta as pure integer arithmetic: 0 = same day, 1 = yesterday.
+    days_since_last = None if last_escape is None else today - last_escape // 86400
 
     # Update escape counts
     total_escapes += 1
-    if last_escape is None or last_escape.date() != now.date():
-        today_escapes = 1
-    else:
+    if days_since_last == 0:
         today_escapes += 1
+    else:
+        today_escapes = 1
 
     # Update streak only if success flag is true
-    if request.success:
-        if last_escape is None:
+    if success:
+        if days_since_last == 1:
+            streak += 1
+        elif days_since_last != 0:
             streak = 1
-        else:
-            if last_escape.date() == (now.date() - timedelta(days=1)):
-                streak += 1
-            elif last_escape.date() == now.date():
-                # streak stays the same for additional successes on same day
-                streak = streak
-            else:
-                streak = 1
-    # Update user record
-    cur.execute(
-        "UPDATE users SET total_escapes = ?, today_escapes = ?, last_escape = ?, streak = ? WHERE user_id = ?",
-        (total_escapes, today_escapes, now.isoformat(), streak, user_id)
-    )
-    # Insert into user_loops table
-    cur.execute(
-        "INSERT INTO user_loops (user_id, loop_id, success, timestamp) VALUES (?, ?, ?, ?)",
-        (user_id, request.loop_id, 1 if request.success else 0, now.isoformat())
+        # streak stays the same for additional successes on the same day
+
+    stats[1:] = [total_escapes, today_escapes, now, streak]
+    _WRITE_QUEUE.put_nowait(
+        (user_id, join_date, total_escapes, today_escapes, now, streak, request.loop_id, success)
     )
-    conn.commit()
-    conn.close()
-    # Return updated stats
+    # Return updated stats; timestamps become ISO strings only here, at
+    # the response boundary.
+    now_iso = datetime.utcfromtimestamp(now).isoformat()
     return {
         "message": "Loop completion recorded",
         "user": {
             "user_id": user_id,
-            "join_date": row[1] if row else now.isoformat(),
+            "join_date": now_iso if join_date == now else datetime.utcfromtimestamp(join_date).isoformat(),
             "total_escapes": total_escapes,
             "today_escapes": today_escapes,
-            "last_escape": now.isoformat(),
+            "last_escape": now_iso,
             "streak": streak,
         },
     }
 
 
 @app.get("/leaderboard")
-async def get_leaderboard(limit: int = 10, auth: None = Depends(verify_api_key)):
+def get_leaderboard(limit: int = 10, auth: None = Depends(verify_api_key)):
     """Return a simple leaderboard sorted by total escapes.
 
     Requires a valid API key. You can adjust the `limit` query parameter
     to control how many users are returned.
     """
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT user_id, total_escapes, today_escapes, last_escape, streak, join_date FROM users ORDER BY total_escapes DESC LIMIT ?",
-        (limit,)
-    )
-    rows = cur.fetchall()
-    conn.close()
+    with db() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT user_id, total_escapes, today_escapes, last_escape, streak, join_date FROM users ORDER BY total_escapes DESC LIMIT ?",
+            (limit,)
+        )
+        rows = cur.fetchall()
     leaderboard = []
     for row in rows:
         leaderboard.append({
             "user_id": row[0],
             "total_escapes": row[1],
             "today_escapes": row[2],
-            "last_escape": row[3],
+            "last_escape": datetime.utcfromtimestamp(row[3]).isoformat() if row[3] is not None else None,
             "streak": row[4],
-            "join_date": row[5],
+            "join_date": datetime.utcfromtimestamp(row[5]).isoformat(),
         })
     return leaderboard